@@ -1,42 +1,49 @@
 import os
-import chromadb
-from chromadb.utils import embedding_functions
+import numpy as np
+import xxhash
+from langchain_text_splitters import RecursiveCharacterTextSplitter
 
-# Setup Database
-chroma_client = chromadb.PersistentClient(path="./university_db")
-embedding_func = embedding_functions.DefaultEmbeddingFunction()
-
-collection = chroma_client.get_or_create_collection(
-    name="university_info",
-    embedding_function=embedding_func
-)
+from embedding import get_embedding_function
+from vector_index import build_index
 
 INPUT_DIR = "university_docs"
 
 documents = []
 metadatas = []
-ids = []
+seen = set()  # xxh64 digests of chunks already queued (skip exact duplicates)
 
 print("📂 Reading text files...")
 
-for filename in os.listdir(INPUT_DIR):
-    if filename.endswith(".txt"):
-        filepath = os.path.join(INPUT_DIR, filename)
-        with open(filepath, "r", encoding="utf-8") as f:
+# Boundary-aware chunking: prefer paragraph, then line, then sentence breaks
+splitter = RecursiveCharacterTextSplitter(
+    chunk_size=800,
+    chunk_overlap=100,
+    separators=["\n\n", "\n", ". ", " "],
+)
+
+for entry in os.scandir(INPUT_DIR):
+    if entry.name.endswith(".txt") and entry.is_file():
+        with open(entry.path, "r", encoding="utf-8") as f:
             content = f.read()
-            
-            # Simple Chunking (Split by 1000 characters)
-            chunk_size = 1000
-            for i in range(0, len(content), chunk_size):
-                chunk = content[i:i+chunk_size]
-                
-                documents.append(chunk)
-                metadatas.append({"source": filename})
-                ids.append(f"{filename}_{i}")
+
+        for chunk in splitter.split_text(content):
+            h = xxhash.xxh64(chunk.encode("utf-8")).intdigest()
+            if h in seen:
+                continue
+            seen.add(h)
+
+            documents.append(chunk)
+            metadatas.append({"source": entry.name})
 
 if documents:
-    print(f"💾 Adding {len(documents)} chunks to the database...")
-    collection.add(documents=documents, metadatas=metadatas, ids=ids)
+    print(f"🧠 Encoding {len(documents)} chunks...")
+    # Same ONNX MiniLM runtime main.py embeds queries with (normalized output)
+    embedding_func = get_embedding_function()
+    embeddings = np.asarray(embedding_func(documents), dtype="float32")
+
+    # FAISS index + chunk texts read by main.py
+    print(f"💾 Writing {len(documents)} chunks to the index...")
+    build_index(embeddings, documents, metadatas)
     print("✅ Database built successfully!")
 else:
     print("⚠️ No documents found! Did you run crawl.py?")
\ No newline at end of file
@@ -1,12 +1,17 @@
 import asyncio
 import argparse
-import json
+import multiprocessing
 import os
 import re
 import sys
+from concurrent.futures import ProcessPoolExecutor
 from urllib.parse import urljoin, urlparse
 
+import httpx
+import orjson
 from bs4 import BeautifulSoup
+from lxml import etree
+from lxml import html as lxml_html
 from crawl4ai import AsyncWebCrawler, BrowserConfig, CrawlerRunConfig, CacheMode
 
 # ─────────────────────────────────────────────────────────────
@@ -16,7 +21,9 @@ START_URL = "https://www.bracu.ac.bd/"
 OUTPUT_DIR = "university_docs"
 STATE_FILE = "crawl_state.json"       # for resume support
 MAX_RETRIES = 2
-POLITENESS_DELAY = 1.0                # seconds between requests
+POLITENESS_DELAY = 1.0                # seconds between requests (per worker)
+NUM_WORKERS = 8                       # pages fetched concurrently
+USER_AGENT = "Mozilla/5.0 (compatible; Uni-Bot crawler; +https://uni-bot-1.onrender.com)"
 
 # Priority seed paths – these are appended to the base URL so the
 # crawler does not have to *discover* them through link-following.
@@ -66,6 +73,51 @@ SKIP_EXTENSIONS = frozenset([
     ".mp3", ".mp4", ".avi", ".mov", ".wmv",
 ])
 
+# One compiled pass instead of a Python loop over SKIP_EXTENSIONS per link
+_SKIP_EXT_RE = re.compile(
+    r"(?:%s)(?:\?|$)" % "|".join(re.escape(ext) for ext in sorted(SKIP_EXTENSIONS)),
+    re.I,
+)
+_JUNK_URL_RE = re.compile(r"#|javascript:|mailto:|tel:")
+
+
+class _FilenameTable(dict):
+    """str.translate table keeping alphanumerics, '_' and '-' and
+    deleting everything else; filled in lazily per codepoint."""
+
+    def __missing__(self, codepoint: int) -> int | None:
+        char = chr(codepoint)
+        keep = char.isalnum() or char in "_-"
+        self[codepoint] = codepoint if keep else None
+        return self[codepoint]
+
+
+_FILENAME_TABLE = _FilenameTable()
+
+# Precompiled XPath expressions for the cheap link / title harvest
+_LINKS_XP = etree.XPath("//a/@href", smart_strings=False)
+_TITLE_XP = etree.XPath("string(//title)")
+
+# Class/id fragments that mark boilerplate containers
+_NOISE_RE = re.compile(
+    r"(menu|nav|sidebar|breadcrumb|search|social|footer|widget|"
+    r"cookie|popup|modal|banner|advertisement|ad-|slick|carousel)",
+    re.I,
+)
+
+# Common UI labels (lower-cased) that carry no content on their own
+_JUNK_LABELS = frozenset({
+    "apply now", "read more", "learn more", "click here",
+    "skip to main", "search form", "toggle navigation",
+    "back to top", "follow us", "share this",
+})
+
+# Lines made up only of punctuation / symbols
+_ONLY_PUNCT = re.compile(r"^[\W_]+\Z")
+
+# Leading <?xml ... ?> declaration (XHTML); lxml rejects it on a str
+_XML_DECL_RE = re.compile(r"^\s*<\?xml[^>]*\?>")
+
 
 # ─────────────────────────────────────────────────────────────
 # HELPERS
@@ -76,9 +128,9 @@ def is_valid_url(url: str) -> bool:
     parsed = urlparse(url)
     if parsed.netloc not in ALLOWED_DOMAINS:
         return False
-    if any(url.lower().endswith(ext) for ext in SKIP_EXTENSIONS):
+    if _SKIP_EXT_RE.search(url):
         return False
-    if "#" in url or "javascript:" in url or "mailto:" in url or "tel:" in url:
+    if _JUNK_URL_RE.search(url):
         return False
     return True
 
@@ -86,27 +138,22 @@ def is_valid_url(url: str) -> bool:
 def clean_filename(url: str) -> str:
     """Create a filesystem-safe filename from a URL."""
     name = url.replace("https://", "").replace("http://", "").replace("/", "_")
-    name = "".join(c if c.isalnum() or c in "_-" else "" for c in name)
-    return name[:80] + ".txt"
+    return name.translate(_FILENAME_TABLE)[:80] + ".txt"
 
 
-def extract_page_title(html: str) -> str:
+def extract_page_title(doc: lxml_html.HtmlElement) -> str:
     """Pull the <title> tag content."""
-    soup = BeautifulSoup(html, "html.parser")
-    tag = soup.find("title")
-    return tag.get_text(strip=True) if tag else ""
+    return _TITLE_XP(doc).strip()
 
 
-def extract_clean_content(html: str) -> str:
+def extract_clean_content(soup: BeautifulSoup) -> str:
     """
-    Extract meaningful text from raw HTML, stripping navigation,
+    Extract meaningful text from a parsed page, stripping navigation,
     footer, sidebar, and other boilerplate elements.
-    """
-    if not html:
-        return ""
-
-    soup = BeautifulSoup(html, "html.parser")
 
+    NOTE: this decomposes tags in-place, so do not reuse the soup
+    afterwards.
+    """
     # 1. Remove structural noise
     for tag in soup(["script", "style", "nav", "footer", "header",
                      "aside", "form", "iframe", "noscript", "svg",
@@ -114,16 +161,11 @@ def extract_clean_content(html: str) -> str:
         tag.decompose()
 
     # 2. Remove class/id-based noise
-    noise_pattern = re.compile(
-        r"(menu|nav|sidebar|breadcrumb|search|social|footer|widget|"
-        r"cookie|popup|modal|banner|advertisement|ad-|slick|carousel)",
-        re.I,
-    )
     for el in soup.find_all(["div", "section", "ul", "aside"],
-                            class_=noise_pattern):
+                            class_=_NOISE_RE):
         el.decompose()
     for el in soup.find_all(["div", "section", "ul", "aside"],
-                            id=noise_pattern):
+                            id=_NOISE_RE):
         el.decompose()
 
     # 3. Extract text, preserving some structure
@@ -142,15 +184,10 @@ def extract_clean_content(html: str) -> str:
         if len(line) < 10:
             continue
         # Skip common UI labels
-        junk_labels = [
-            "Apply Now", "Read More", "Learn More", "Click Here",
-            "Skip to main", "Search form", "Toggle navigation",
-            "Back to top", "Follow us", "Share this",
-        ]
-        if any(line.lower() == label.lower() for label in junk_labels):
+        if line.lower() in _JUNK_LABELS:
             continue
         # Skip lines that are only punctuation / symbols
-        if re.match(r"^[\W_]+$", line):
+        if _ONLY_PUNCT.match(line):
             continue
 
         seen.add(line)
@@ -159,13 +196,11 @@ def extract_clean_content(html: str) -> str:
     return "\n".join(clean_lines)
 
 
-def extract_links(html: str, base_url: str) -> list[str]:
-    """Return a deduplicated list of valid links found in the HTML."""
-    soup = BeautifulSoup(html, "html.parser")
+def extract_links(doc: lxml_html.HtmlElement, base_url: str) -> list[str]:
+    """Return a deduplicated list of valid links found in the page."""
     found: list[str] = []
     seen = set()
-    for a_tag in soup.find_all("a", href=True):
-        href = a_tag["href"]
+    for href in _LINKS_XP(doc):
         full = urljoin(base_url, href).split("#")[0].strip()
         if full.endswith("/"):
             full = full[:-1]
@@ -175,50 +210,166 @@ def extract_links(html: str, base_url: str) -> list[str]:
     return found
 
 
+def parse_page(html: str, url: str) -> tuple[str, list[str], str]:
+    """Return (clean_text, links, title) for a raw HTML page.
+
+    Pure function of its arguments so it can run in a worker process."""
+    if not html:
+        return "", [], ""
+
+    # ── Title + links straight off the lxml tree ──
+    try:
+        doc = lxml_html.fromstring(_XML_DECL_RE.sub("", html, count=1))
+    except etree.ParserError:
+        # No elements at all (whitespace / comment only)
+        title, links = "", []
+    else:
+        title = extract_page_title(doc)
+        links = extract_links(doc, url)
+
+    # ── Content extraction ──
+    clean_text = extract_clean_content(BeautifulSoup(html, "lxml"))
+    return clean_text, links, title
+
+
 # ─────────────────────────────────────────────────────────────
 # STATE PERSISTENCE  (resume support)
 # ─────────────────────────────────────────────────────────────
 def load_state() -> tuple[set[str], list[str]]:
     """Load previously visited URLs and remaining queue."""
     if os.path.exists(STATE_FILE):
-        with open(STATE_FILE, "r") as f:
-            data = json.load(f)
+        with open(STATE_FILE, "rb") as f:
+            data = orjson.loads(f.read())
         return set(data.get("visited", [])), list(data.get("queue", []))
     return set(), []
 
 
-def save_state(visited: set[str], queue: list[str]) -> None:
-    with open(STATE_FILE, "w") as f:
-        json.dump({"visited": list(visited), "queue": queue}, f, indent=2)
+def save_state(visited: set[str], queue: dict[str, None]) -> None:
+    """Write state to a temp file and swap it in, so a crash mid-write
+    never leaves a truncated state file behind."""
+    data = orjson.dumps({"visited": list(visited), "queue": list(queue)})
+    tmp_path = STATE_FILE + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, STATE_FILE)
 
 
 # ─────────────────────────────────────────────────────────────
 # MAIN CRAWLER
 # ─────────────────────────────────────────────────────────────
+async def fetch_static(client: httpx.AsyncClient, url: str) -> str | None:
+    """Fetch server-rendered HTML over the pooled HTTP client.
+    Returns None when the page should go through the browser instead."""
+    try:
+        response = await client.get(url)
+    except httpx.HTTPError:
+        return None
+    if response.status_code != 200:
+        return None
+    if "html" not in response.headers.get("content-type", ""):
+        return None
+    return response.text or None
+
+
+async def crawl_page(client: httpx.AsyncClient, crawler: AsyncWebCrawler,
+                     run_cfg: CrawlerRunConfig, pool: ProcessPoolExecutor,
+                     current_url: str, tag: str) -> list[str] | None:
+    """Fetch one page, save its cleaned text and return the links found
+    on it, or None if every attempt failed.
+
+    Parsing runs on `pool` (CPU-bound, GIL-free); network and file I/O
+    stay on the event loop."""
+    loop = asyncio.get_running_loop()
+    for attempt in range(1, MAX_RETRIES + 1):
+        try:
+            # Plain HTTP first; only pages that come back empty (or render
+            # their content with JS) pay for a headless browser load.
+            clean_text, new_links, title = "", [], ""
+            html = await fetch_static(client, current_url)
+            if html:
+                try:
+                    clean_text, new_links, title = await loop.run_in_executor(
+                        pool, parse_page, html, current_url)
+                except Exception as exc:
+                    print(f"   ⚠️  {tag} Static parse error: {exc}")
+                    html = None
+
+            if len(clean_text) <= 150:
+                try:
+                    result = await crawler.arun(url=current_url, config=run_cfg)
+                    browser_html = result.html if result.success else None
+                except Exception as exc:
+                    print(f"   ⚠️  {tag} Attempt {attempt} browser error: {exc}")
+                    browser_html = None
+
+                if browser_html:
+                    clean_text, new_links, title = await loop.run_in_executor(
+                        pool, parse_page, browser_html, current_url)
+                elif not html:
+                    print(f"   ❌ {tag} Attempt {attempt}: page load failed")
+                    await asyncio.sleep(attempt * 2)
+                    continue
+                # else: browser failed or came back empty, keep the static result
+
+            if len(clean_text) > 150:
+                filename = clean_filename(current_url)
+                filepath = os.path.join(OUTPUT_DIR, filename)
+                with open(filepath, "w", encoding="utf-8") as f:
+                    f.write(f"Source URL: {current_url}\n")
+                    f.write(f"Page Title: {title}\n\n")
+                    f.write(clean_text)
+                print(f'   ✅ {tag} Saved  ({len(clean_text):,} chars)  "{title}"')
+            else:
+                print(f"   ⚠️  {tag} Too little content after cleaning – skipped")
+
+            return new_links
+
+        except Exception as exc:
+            print(f"   ⚠️  {tag} Attempt {attempt} error: {exc}")
+            await asyncio.sleep(attempt * 2)
+
+    return None
+
+
 async def main(max_pages: int, resume: bool) -> None:
     os.makedirs(OUTPUT_DIR, exist_ok=True)
 
     # Build initial queue
     if resume:
-        visited, queue = load_state()
-        print(f"♻️  Resuming: {len(visited)} already visited, {len(queue)} in queue")
+        visited, pending = load_state()
+        print(f"♻️  Resuming: {len(visited)} already visited, {len(pending)} in queue")
     else:
         visited: set[str] = set()
-        queue: list[str] = []
+        pending: list[str] = []
+
+    # `frontier` hands URLs out to the workers in FIFO order (deque-backed);
+    # `queued` mirrors its contents as an ordered set (dict keys) for O(1)
+    # membership checks while save_state still writes the queue in order.
+    frontier: asyncio.Queue[str] = asyncio.Queue()
+    queued: dict[str, None] = {}
+
+    def enqueue(url: str) -> bool:
+        if url in visited or url in queued:
+            return False
+        frontier.put_nowait(url)
+        queued[url] = None
+        return True
+
+    for url in pending:
+        enqueue(url)
 
     # Seed with priority URLs (skip already-visited ones)
     base = START_URL.rstrip("/")
     for path in SEED_PATHS:
-        url = (base + path).rstrip("/")
-        if url not in visited and url not in queue:
-            queue.append(url)
+        enqueue((base + path).rstrip("/"))
 
-    if not queue:
+    if not queued:
         print("Nothing to crawl – queue is empty.")
         return
 
-    print(f"🚀 Starting BRAC University crawl  (max {max_pages} pages)")
-    print(f"   Seeds: {len(queue)} URLs in queue\n")
+    print(f"🚀 Starting BRAC University crawl  (max {max_pages} pages, "
+          f"{NUM_WORKERS} workers)")
+    print(f"   Seeds: {len(queued)} URLs in queue\n")
 
     browser_cfg = BrowserConfig(
         headless=True,
@@ -230,75 +381,92 @@ async def main(max_pages: int, resume: bool) -> None:
         wait_until="domcontentloaded",
     )
 
-    async with AsyncWebCrawler(config=browser_cfg) as crawler:
-        count = 0
-
-        while queue and count < max_pages:
-            current_url = queue.pop(0)
-            if current_url.endswith("/"):
-                current_url = current_url[:-1]
-            if current_url in visited:
-                continue
-
-            print(f"[{count + 1}/{max_pages}]  {current_url}")
-
-            success = False
-            for attempt in range(1, MAX_RETRIES + 1):
-                try:
-                    result = await crawler.arun(url=current_url, config=run_cfg)
-
-                    if not result.success:
-                        print(f"   ❌ Attempt {attempt}: page load failed")
-                        await asyncio.sleep(attempt * 2)
+    # Guards the shared state; notified whenever an in-flight page finishes
+    budget = asyncio.Condition()
+    count = 0          # pages crawled successfully
+    in_progress = 0    # pages currently being fetched
+
+    async def worker(client: httpx.AsyncClient, crawler: AsyncWebCrawler,
+                     pool: ProcessPoolExecutor) -> None:
+        nonlocal count, in_progress
+        while True:
+            current_url = await frontier.get()
+            try:
+                async with budget:
+                    # All slots reserved: wait for an in-flight page to finish,
+                    # since a failure there frees its slot again.
+                    await budget.wait_for(
+                        lambda: count >= max_pages or count + in_progress < max_pages)
+                    # Budget used up: leave the URL pending for --resume
+                    if count >= max_pages:
                         continue
-
-                    # ── Content extraction ──
-                    title = extract_page_title(result.html)
-                    clean_text = extract_clean_content(result.html)
-
-                    if len(clean_text) > 150:
-                        filename = clean_filename(current_url)
-                        filepath = os.path.join(OUTPUT_DIR, filename)
-                        with open(filepath, "w", encoding="utf-8") as f:
-                            f.write(f"Source URL: {current_url}\n")
-                            f.write(f"Page Title: {title}\n\n")
-                            f.write(clean_text)
-                        print(f'   ✅ Saved  ({len(clean_text):,} chars)  "{title}"')
-                    else:
-                        print(f"   ⚠️  Too little content after cleaning – skipped")
-
-                    # ── Discover new links ──
-                    if result.html:
-                        new_links = extract_links(result.html, current_url)
+                    queued.pop(current_url, None)
+                    if current_url.endswith("/"):
+                        current_url = current_url[:-1]
+                    if current_url in visited:
+                        continue
+                    # Mark visited up front so no other worker picks it up
+                    # (and regardless of success, to avoid infinite retries)
+                    visited.add(current_url)
+                    in_progress += 1
+                    tag = f"[{count + in_progress}/{max_pages}]"
+
+                print(f"{tag}  {current_url}")
+                new_links = await crawl_page(client, crawler, run_cfg, pool,
+                                             current_url, tag)
+
+                async with budget:
+                    in_progress -= 1
+                    budget.notify_all()
+                    if new_links is not None:
+                        count += 1
+                        # ── Discover new links ──
                         added = 0
                         for link in new_links:
-                            if link not in visited and link not in queue:
-                                queue.append(link)
+                            if enqueue(link):
                                 added += 1
                         if added:
-                            print(f"   🔗 +{added} new links")
-
-                    success = True
-                    break  # no need to retry
-
-                except Exception as exc:
-                    print(f"   ⚠️  Attempt {attempt} error: {exc}")
-                    await asyncio.sleep(attempt * 2)
-
-            # Mark visited regardless of success (avoid infinite retries)
-            visited.add(current_url)
-            if success:
-                count += 1
+                            print(f"   🔗 {tag} +{added} new links")
+
+                        # Save state periodically (every 10 pages)
+                        if count % 10 == 0:
+                            save_state(visited, queued)
+
+                # Politeness delay
+                await asyncio.sleep(POLITENESS_DELAY)
+            finally:
+                frontier.task_done()
+
+    http_client = httpx.AsyncClient(
+        http2=True,
+        limits=httpx.Limits(max_connections=64, max_keepalive_connections=32),
+        timeout=30,
+        follow_redirects=True,
+        headers={"User-Agent": USER_AGENT},
+    )
 
-            # Save state periodically (every 10 pages)
-            if count % 10 == 0:
-                save_state(visited, queue)
+    # At most NUM_WORKERS parses run at once. No plain fork: by the time
+    # the pool spawns, the process has executor/child-watcher threads, and
+    # forking a multi-threaded process can deadlock. (Windows: spawn only.)
+    start_method = ("forkserver"
+                    if "forkserver" in multiprocessing.get_all_start_methods()
+                    else "spawn")
+    pool = ProcessPoolExecutor(
+        max_workers=min(NUM_WORKERS, os.cpu_count() or 1),
+        mp_context=multiprocessing.get_context(start_method),
+    )
 
-            # Politeness delay
-            await asyncio.sleep(POLITENESS_DELAY)
+    with pool:
+        async with http_client as client, AsyncWebCrawler(config=browser_cfg) as crawler:
+            workers = [asyncio.create_task(worker(client, crawler, pool))
+                       for _ in range(NUM_WORKERS)]
+            await frontier.join()
+            for task in workers:
+                task.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
 
     # Final state save
-    save_state(visited, queue)
+    save_state(visited, queued)
     print(f"\n🏁 Done!  Crawled {count} pages.  Files in ./{OUTPUT_DIR}/")
 
 
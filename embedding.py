@@ -0,0 +1,22 @@
+import onnxruntime
+from chromadb.utils import embedding_functions
+
+# Execution providers in order of preference; whichever are present in the
+# installed onnxruntime build are used (CPU is always available).
+PREFERRED_PROVIDERS = [
+    "CUDAExecutionProvider",
+    "CoreMLExecutionProvider",
+    "DmlExecutionProvider",
+    "CPUExecutionProvider",
+]
+
+
+def get_embedding_function() -> embedding_functions.ONNXMiniLM_L6_V2:
+    """all-MiniLM-L6-v2 under ONNX Runtime on the best available device.
+
+    Same model and (normalized) output as Chroma's DefaultEmbeddingFunction,
+    so it stays compatible with an index built by either one.
+    """
+    available = set(onnxruntime.get_available_providers())
+    providers = [p for p in PREFERRED_PROVIDERS if p in available]
+    return embedding_functions.ONNXMiniLM_L6_V2(preferred_providers=providers)
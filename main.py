@@ -1,4 +1,8 @@
 import asyncio
+from collections import deque
+from contextlib import asynccontextmanager
+from functools import lru_cache
+from cachetools import TTLCache
 from dotenv import load_dotenv
 from fastapi import FastAPI, Request, WebSocket, WebSocketDisconnect
 from google import genai
@@ -6,24 +10,101 @@ import os
 from google.genai import types
 from fastapi.templating import Jinja2Templates
 from fastapi.responses import HTMLResponse
-import chromadb
-from chromadb.utils import embedding_functions
 
+from embedding import get_embedding_function
+from vector_index import load_index, search
+
+
+@lru_cache(maxsize=1)
+def get_retriever():
+    """Embedder + FAISS index, loaded once per process."""
+    sentence_transformer_ef = get_embedding_function()
+    # The ONNX model is downloaded and its session/tokenizer built lazily on
+    # the first call; do it now so the first real query doesn't pay for it.
+    sentence_transformer_ef(["warmup"])
+    index, documents, _ = load_index()
+    return sentence_transformer_ef, index, documents
+
+
+@lru_cache(maxsize=1)
+def get_client() -> genai.Client:
+    return genai.Client(api_key=os.getenv("API_KEY"))
+
+
+# Retrieved context keyed by the normalized question (skips embed + ANN on repeats)
+rag_cache = TTLCache(maxsize=1024, ttl=600)
+
+# Queries arriving within one window are embedded and searched together
+QUERY_BATCH_WINDOW = 0.02   # seconds
+QUERY_BATCH_SIZE = 16
+RETRIEVAL_TIMEOUT = 10      # seconds before a queued query gives up
+
+
+def retrieve(texts: list[str]) -> list[list[str]]:
+    sentence_transformer_ef, index, documents = get_retriever()
+    return search(index, documents, sentence_transformer_ef(texts), n_results=3)
+
+
+async def batch_retriever(query_queue: asyncio.Queue):
+    while True:
+        batch = [await query_queue.get()]
+        await asyncio.sleep(QUERY_BATCH_WINDOW)
+        while len(batch) < QUERY_BATCH_SIZE and not query_queue.empty():
+            batch.append(query_queue.get_nowait())
+
+        texts = [text for text, _ in batch]
+        try:
+            results = await asyncio.to_thread(retrieve, texts)
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            continue
+
+        for (_, future), docs in zip(batch, results):
+            if not future.done():
+                future.set_result(docs)
+
+
+async def retrieve_context(state, user_input: str) -> str:
+    batcher = getattr(state, "batcher", None)
+    if batcher is None or batcher.done():
+        raise RuntimeError("retrieval batcher is not running")
+
+    future = asyncio.get_running_loop().create_future()
+    await state.query_queue.put((user_input, future))
+    return "\n\n".join(await asyncio.wait_for(future, RETRIEVAL_TIMEOUT))
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Load heavy resources at startup rather than at import time
+    await asyncio.to_thread(get_retriever)
+    get_client()
+    app.state.query_queue = asyncio.Queue()
+    app.state.batcher = asyncio.create_task(batch_retriever(app.state.query_queue))
+    yield
+    app.state.batcher.cancel()
 
-chroma_client = chromadb.PersistentClient(path="./university_db")
-sentence_transformer_ef = embedding_functions.DefaultEmbeddingFunction()
-collection = chroma_client.get_collection(
-    name="university_info", 
-    embedding_function=sentence_transformer_ef
-)
 
 load_dotenv()
-app = FastAPI() 
+app = FastAPI(lifespan=lifespan)
 
 templates = Jinja2Templates(directory="templates")
 
-
-client = genai.Client(api_key=os.getenv("API_KEY"))
+HISTORY_MAX_TURNS = 50   # user + model messages kept per WebSocket connection
+
+RAG_PROMPT = (
+    "You are a helpful assistant for my university.\n"
+    "Use the following retrieved context to answer the question below.\n"
+    "If the answer isn't in the context, say you don't know.\n"
+    "\n"
+    "CONTEXT FROM DATABASE:\n"
+    "{ctx}\n"
+    "\n"
+    "USER QUESTION:\n"
+    "{q}\n"
+)
 
 my_config = types.GenerateContentConfig(
 system_instruction=(
@@ -46,42 +127,45 @@ def welcome(req: Request):
 async def chat(websocket: WebSocket):
     
     await websocket.accept() 
-    chat_session = client.chats.create(
-        model='gemini-3-flash-preview', 
-        config=my_config
-    )
     
-    # Local history for this connection only
+    # Local history for this connection only: plain question/answer turns,
+    # bounded so the prompt (and its cost) stops growing with the session.
+    # Retrieved context is sent for the current question only.
+    history = deque(maxlen=HISTORY_MAX_TURNS)
 
     try:
         while True:
             user_input = await websocket.receive_text() 
     
 
-            results = collection.query(
-            query_texts=[user_input],
-                n_results=3
-        
-            )
-            retrieved_context = "\n\n".join(results['documents'][0])
-            augmented_message = f"""
-                You are a helpful assistant for my university.
-                Use the following retrieved context to answer the question below. 
-                If the answer isn't in the context, say you don't know.
-
-                CONTEXT FROM DATABASE:
-                {retrieved_context}
-
-                USER QUESTION:
-                {user_input}
-                """
+            cache_key = user_input.strip().lower()
+            retrieved_context = rag_cache.get(cache_key)
+            if retrieved_context is None:
+                try:
+                    retrieved_context = await retrieve_context(websocket.app.state, user_input)
+                except Exception as e:
+                    # One failed lookup shouldn't end the session (and is never cached)
+                    print(f"Retrieval error: {e!r}")
+                    await websocket.send_text("Sorry, I couldn't search the university documents right now. Please try again.")
+                    continue
+                rag_cache[cache_key] = retrieved_context
+            augmented_message = RAG_PROMPT.format(ctx=retrieved_context, q=user_input)
 
              
-            response_stream = chat_session.send_message_stream(augmented_message)
-            for chunk in response_stream:
+            response_stream = await get_client().aio.models.generate_content_stream(
+                model='gemini-3-flash-preview',
+                contents=[*history, types.UserContent(parts=[types.Part.from_text(text=augmented_message)])],
+                config=my_config
+            )
+            answer = []
+            async for chunk in response_stream:
                     if chunk.text:
+                        answer.append(chunk.text)
                         await websocket.send_text(chunk.text)
-                        await asyncio.sleep(0.07)
+
+            if answer:
+                history.append(types.UserContent(parts=[types.Part.from_text(text=user_input)]))
+                history.append(types.ModelContent(parts=[types.Part.from_text(text="".join(answer))]))
             
             
            